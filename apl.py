@@ -11,76 +11,75 @@
 #
 # Run the bottom demo to see behavior for expressions like: buff.steady_focus.stack > 0
 
-import re, math
+import re, sys
+from types import MappingProxyType
+from functools import lru_cache
+from itertools import product
 from typing import List, Tuple, Dict, Optional, Any, Union
 
 # ---------- Tokenizer (compact) ----------
+# operators share one alternation (two-char forms first); the lexeme picks the token kind
+OP_KINDS = {
+    '==': 'EQ', '=': 'EQ', '!=': 'NE', '<=': 'LE', '>=': 'GE', '<': 'LT', '>': 'GT',
+    '.': 'DOT', '(': 'LPAREN', ')': 'RPAREN', ',': 'COMMA', '+': 'PLUS', '-': 'MINUS', '*': 'STAR',
+    '&': 'AMP', '|': 'PIPE', '^': 'CARET', '!': 'BANG',
+}
 TOKEN_SPEC = [
     ('NUMBER',   r'\d+(\.\d+)?'),
     ('IDENT',    r'[A-Za-z_][A-Za-z0-9_]*'),
-    ('DOT',      r'\.'),
-    ('LPAREN',   r'\('),
-    ('RPAREN',   r'\)'),
-    ('COMMA',    r','),
-    ('PLUS',     r'\+'),
-    ('MINUS',    r'-'),
-    ('STAR',     r'\*'),
-    ('EQ',       r'==|='),
-    ('NE',       r'!='),
-    ('LE',       r'<='),
-    ('GE',       r'>='),
-    ('LT',       r'<'),
-    ('GT',       r'>'),
-    ('AMP',      r'&'),
-    ('PIPE',     r'\|'),
-    ('CARET',    r'\^'),
-    ('BANG',     r'!'),
-    ('WS',       r'[ \t]+'),
-    ('NEWLINE',  r'\n'),
+    ('OP',       r'==|!=|<=|>=|[=<>.(),+\-*&|^!]'),
+    ('WS',       r'[ \t\n]+'),  # whole whitespace run incl. newlines in one match
     ('MISMATCH', r'.'),
 ]
 MASTER_RE = re.compile('|'.join('(?P<%s>%s)' % pair for pair in TOKEN_SPEC))
 
 def lex(text: str):
+    # MISMATCH matches any char and WS covers '\n', so finditer tiles the whole text and the scan loop runs in C
     tokens = []
-    line, col = 1, 1
-    pos = 0
-    while pos < len(text):
-        m = MASTER_RE.match(text, pos)
-        if not m:
-            raise SyntaxError(f"Unexpected char at {line}:{col}")
+    line, line_start = 1, 0  # only whitespace runs can contain newlines, so only they move these
+    for m in MASTER_RE.finditer(text):
         kind = m.lastgroup
         val = m.group()
-        if kind == 'NEWLINE':
-            line += 1; col = 1; pos = m.end(); continue
         if kind == 'WS':
-            pos = m.end(); col += len(val); continue
+            nls = val.count('\n')
+            if nls:
+                line += nls; line_start = m.start() + val.rindex('\n') + 1
+            continue
+        col = m.start() - line_start + 1
         if kind == 'MISMATCH':
             raise SyntaxError(f"Unexpected {val!r} at {line}:{col}")
+        if kind == 'OP':
+            kind = OP_KINDS[val]
+        elif kind == 'IDENT':
+            val = sys.intern(val)  # identifier parts become registry/cache keys; interned keys compare by identity
         tokens.append((kind, val, line, col))
-        pos = m.end(); col += len(val)
-    tokens.append(('EOF','',line, col))
+    tokens.append(('EOF','',line, len(text) - line_start + 1))
     return tokens
 
 # ---------- Minimal expression parser (supports identifiers with dots) ----------
 class ParseError(Exception): pass
 
 class Expr:
+    # nodes are not mutated after construction; with no __eq__ they hash by identity, which compile_expr's cache relies on
+    __slots__ = ()
     def eval(self, ctx): raise NotImplementedError()
     def walk_idents(self): return []
 
 class Literal(Expr):
+    __slots__ = ('v',)
     def __init__(self, v): self.v = float(v)
     def eval(self, ctx): return self.v
     def __repr__(self): return f"Lit({self.v})"
 
 class Ident(Expr):
-    def __init__(self, parts: List[str]): self.parts = parts
+    __slots__ = ('parts',)
+    def __init__(self, parts: List[str]): self.parts = tuple(parts)
     def eval(self, ctx): return ctx.resolve_identifier(self.parts)
     def walk_idents(self): return [self.parts]
     def __repr__(self): return "Ident(" + ".".join(self.parts) + ")"
 
 class Binary(Expr):
+    __slots__ = ('op', 'a', 'b')
     def __init__(self, op, a, b): self.op=op; self.a=a; self.b=b
     def eval(self, ctx):
         la = self.a.eval(ctx)
@@ -105,69 +104,148 @@ class Binary(Expr):
     def walk_idents(self): return self.a.walk_idents() + self.b.walk_idents()
     def __repr__(self): return f"({self.a} {self.op} {self.b})"
 
+# token kind -> (precedence, Binary op); all binary operators are left-associative
+BINOP_PREC = {
+    'PIPE': (1, '|'), 'AMP': (2, '&'),
+    'EQ': (3, '='), 'NE': (3, '!='), 'LT': (3, '<'), 'GT': (3, '>'), 'LE': (3, '<='), 'GE': (3, '>='),
+    'PLUS': (4, '+'), 'MINUS': (4, '-'), 'STAR': (5, '*'),
+}
+# keywords are case-insensitive; every casing is expanded (and interned) once at load so the
+# parser does a single dict probe without allocating tok.lower()
+KEYWORD_BINOPS = {
+    sys.intern(''.join(cs)): info
+    for word, info in (('or', (1, 'or')), ('and', (2, 'and')))
+    for cs in product(*((c, c.upper()) for c in word))
+}
+
 class Parser:
     def __init__(self, tokens):
         self.toks = tokens; self.pos = 0
+        # leaf nodes are immutable, so identical literals / identifier chains within one parse share a node
+        self._literals: Dict[str, Literal] = {}
+        self._idents: Dict[Tuple[str, ...], Ident] = {}
+    def _literal_node(self, text: str) -> Literal:
+        n = self._literals.get(text)
+        if n is None:
+            n = self._literals[text] = Literal(text)
+        return n
+    def _ident_node(self, parts: Tuple[str, ...]) -> Ident:
+        n = self._idents.get(parts)
+        if n is None:
+            n = self._idents[parts] = Ident(parts)
+        return n
     def peek(self): return self.toks[self.pos][0]
     def next(self): t=self.toks[self.pos]; self.pos+=1; return t
     def expect(self, k):
         t=self.next()
         if t[0]!=k: raise ParseError(f"Expected {k} got {t}")
         return t
+    # the parse_* methods below read self.toks/self.pos into locals and index tokens directly
     def parse_ident(self):
-        parts = []
-        tok = self.next()
-        if tok[0] != 'IDENT': raise ParseError("ident expected")
-        parts.append(tok[1])
-        while self.peek() == 'DOT':
-            self.next(); p = self.expect('IDENT')[1]; parts.append(p)
-        return Ident(parts)
+        toks = self.toks; pos = self.pos
+        tok = toks[pos]
+        if tok[0] != 'IDENT': self.pos = pos + 1; raise ParseError("ident expected")
+        parts = [tok[1]]; pos += 1
+        while toks[pos][0] == 'DOT':
+            tok = toks[pos + 1]
+            if tok[0] != 'IDENT': self.pos = pos + 2; raise ParseError(f"Expected IDENT got {tok}")
+            parts.append(tok[1]); pos += 2
+        self.pos = pos
+        return self._ident_node(tuple(parts))
     def parse_primary(self):
-        if self.peek() == 'NUMBER':
-            v = self.next()[1]; return Literal(v)
-        if self.peek() == 'IDENT':
+        tok = self.toks[self.pos]; kind = tok[0]
+        if kind == 'NUMBER':
+            self.pos += 1; return self._literal_node(tok[1])
+        if kind == 'IDENT':
             return self.parse_ident()
-        if self.peek() == 'LPAREN':
-            self.next(); e = self.parse_expr(); self.expect('RPAREN'); return e
+        if kind == 'LPAREN':
+            self.pos += 1; e = self.parse_expr(); self.expect('RPAREN'); return e
         raise ParseError("primary")
-    def parse_mul(self):
+    def parse_binary(self, min_prec: int = 1):
+        # precedence climbing over BINOP_PREC: one frame per operator instead of one per precedence level
+        toks = self.toks
         n = self.parse_primary()
-        while self.peek() in ('STAR',):
-            op = self.next()[1]; r = self.parse_primary(); n = Binary(op, n, r)
-        return n
-    def parse_add(self):
-        n = self.parse_mul()
-        while self.peek() in ('PLUS','MINUS'):
-            tok = self.next()[0]; op = '+' if tok=='PLUS' else '-'; r = self.parse_mul(); n = Binary(op, n, r)
-        return n
-    def parse_cmp(self):
-        n = self.parse_add()
-        while self.peek() in ('EQ','NE','LT','GT','LE','GE'):
-            t = self.next()[0]
-            opmap = {'EQ':'=','NE':'!=','LT':'<','GT':'>','LE':'<=','GE':'>='}
-            op = opmap[t]; r = self.parse_add(); n = Binary(op, n, r)
-        return n
-    def parse_and(self):
-        n = self.parse_cmp()
-        while self.peek() in ('AMP',) or (self.peek()=='IDENT' and self.toks[self.pos][1].lower()=='and'):
-            if self.peek()=='AMP': self.next(); r = self.parse_cmp(); n = Binary('&', n, r)
-            else: self.next(); r=self.parse_cmp(); n=Binary('and', n, r)
-        return n
-    def parse_or(self):
-        n = self.parse_and()
-        while self.peek() in ('PIPE',) or (self.peek()=='IDENT' and self.toks[self.pos][1].lower()=='or'):
-            if self.peek()=='PIPE': self.next(); r=self.parse_and(); n = Binary('|', n, r)
-            else: self.next(); r=self.parse_and(); n = Binary('or', n, r)
+        while True:
+            tok = toks[self.pos]
+            info = BINOP_PREC.get(tok[0])
+            if info is None:
+                if tok[0] != 'IDENT': break
+                info = KEYWORD_BINOPS.get(tok[1])
+                if info is None: break
+            prec, op = info
+            if prec < min_prec: break
+            self.pos += 1
+            n = Binary(op, n, self.parse_binary(prec + 1))
         return n
     def parse_expr(self):
-        return self.parse_or()
+        return self.parse_binary()
+
+@lru_cache(maxsize=128)
+def parse(text: str) -> Expr:
+    """lex + parse with memoization on the source text; APL conditions repeat across reloads.
+       The returned tree is shared between callers and must not be mutated.
+    """
+    return Parser(lex(text)).parse_expr()
+
+_BOOL_OPS = frozenset(('&','and','|','or','=','==','!=','<','<=','>','>='))
+
+def _is_bool_valued(e: Expr) -> bool:
+    # comparisons and logic ops already yield exactly 0.0/1.0, so folding them needs no truth coercion
+    return isinstance(e, Binary) and e.op in _BOOL_OPS
+
+# ---------- Codegen (specialize an expression into a straight-line Python function) ----------
+_CODEGEN_CMP = {'=': '==', '==': '==', '!=': '!=', '<': '<', '<=': '<=', '>': '>', '>=': '>='}
+
+@lru_cache(maxsize=128)
+def compile_expr(expr: Expr):
+    """Generate and exec a Python function `f(ctx) -> float` equivalent to expr.eval(ctx).
+       Literals and identifier chains become bound constants, so a call runs with no AST dispatch.
+       Cached per node (nodes hash by identity and are never mutated after parsing).
+       Falls back to expr.eval when the generated source is too deeply nested to compile.
+    """
+    names: Dict[str, Any] = {}
+    def gen(e) -> str:
+        if isinstance(e, Literal):
+            # bound like identifiers: repr() of a huge literal is 'inf', which is not a name in the generated code
+            n = f"_c{len(names)}"; names[n] = e.v
+            return n
+        if isinstance(e, Ident):
+            n = f"_p{len(names)}"; names[n] = e.parts
+            return f"r({n})"
+        if not isinstance(e, Binary):
+            raise TypeError(f"cannot compile {e!r}")
+        a, b = gen(e.a), gen(e.b)
+        if e.op in ('&','and','|','or'):
+            tb = b if _is_bool_valued(e.b) else f"(1.0 if {b} != 0.0 else 0.0)"
+            if e.op in ('&','and'): return f"(0.0 if {a} == 0.0 else {tb})"
+            return f"(1.0 if {a} != 0.0 else {tb})"
+        if e.op in ('+','-','*'): return f"({a} {e.op} {b})"
+        if e.op in _CODEGEN_CMP: return f"(1.0 if {a} {_CODEGEN_CMP[e.op]} {b} else 0.0)"
+        raise RuntimeError("Unknown op " + e.op)
+    try:
+        body = gen(expr)
+        src = f"def _cond(ctx):\n    r = ctx.resolve_identifier\n    return {body}\n"
+        exec(compile(src, "<apl-codegen>", "exec"), names)
+    except (SyntaxError, RecursionError):
+        # very long conditions exceed CPython's nesting limits (one paren level per operator); use the tree walk
+        fn = lambda ctx: expr.eval(ctx)
+        fn.source = None
+        return fn
+    fn = names['_cond']; fn.source = src
+    return fn
+
+@lru_cache(maxsize=128)
+def compile_condition(text: str):
+    """Parse and specialize a condition once; repeated ticks call the returned f(ctx) directly."""
+    return compile_expr(parse(text))
 
 # ---------- Chain resolution types ----------
 class Handle:
+    __slots__ = ('htype', 'name', 'data')
     def __init__(self, htype: str, name: str, data: Any=None):
         self.htype = htype    # e.g., 'buff'
         self.name = name
-        self.data = data or {}
+        self.data = data if data is not None else {}
     def __repr__(self):
         return f"<Handle {self.htype}:{self.name} data={self.data}>"
     
@@ -188,7 +266,8 @@ class ModuleRegistry:
         self._by_prefix: Dict[str, ModuleBase] = {}
     def register(self, m: ModuleBase):
         for p in m.supported_prefixes():
-            self._by_prefix[p] = m
+            # interned so lookups with interned identifier parts hit the identity fast path
+            self._by_prefix[sys.intern(p)] = m
     def unregister(self, m: ModuleBase):
         for p in list(self._by_prefix.keys()):
             if self._by_prefix[p] is m:
@@ -202,6 +281,7 @@ class ModuleRegistry:
 class AttrResolverBase:
     """Resolve attributes given a handle and a list of parts starting at the attribute.
        Must implement can_resolve(handle_type, attr_name) and resolve(handle, parts, ctx)
+       can_resolve must depend only on its arguments (AttrRegistry caches the answer)
        resolve returns a tuple (result, consumed):
          - if result is float -> numeric value; consumed is number of tokens consumed (>=1)
          - if result is Handle -> another handle object; consumed indicates tokens consumed
@@ -214,26 +294,37 @@ class AttrResolverBase:
 class AttrRegistry:
     def __init__(self):
         self.resolvers: List[AttrResolverBase] = []
-    def register(self, r: AttrResolverBase): self.resolvers.append(r)
+        # (handle_type, attr_name) -> resolver (or None); cleared on register
+        self._index: Dict[Tuple[str, str], Optional[AttrResolverBase]] = {}
+    def register(self, r: AttrResolverBase):
+        self.resolvers.append(r)
+        self._index.clear()
     def find(self, handle_type: str, attr_name: str) -> Optional[AttrResolverBase]:
+        key = (handle_type, attr_name)
+        try:
+            return self._index[key]
+        except KeyError:
+            pass
+        found = None
         for r in self.resolvers:
             try:
                 if r.can_resolve(handle_type, attr_name):
-                    return r
+                    found = r
+                    break
             except Exception:
                 continue
-        return None
+        self._index[key] = found
+        return found
     def find_any(self, attr_name: str) -> Optional[AttrResolverBase]:
-        for r in self.resolvers:
-            try:
-                if r.can_resolve('*', attr_name):
-                    return r
-            except Exception:
-                continue
-        return None
+        return self.find('*', attr_name)
 
 # ---------- Example modules & attribute resolvers ----------
+# read-only data for the shared handles of unknown buffs; a resolver writing into it must not affect later lookups
+_EMPTY_BUFF_DATA = MappingProxyType({})
+
 class BuffModule(ModuleBase):
+    def __init__(self):
+        self._missing: Dict[str, Handle] = {}  # reused empty handles, one per unknown name
     def supported_prefixes(self): return ['buff','debuff']  # both return the same handle type
     def handle_type_for(self, name): return 'buff_inst'
     def get_handle(self, name, ctx):
@@ -246,7 +337,10 @@ class BuffModule(ModuleBase):
         if db is not None:
             return Handle('buff_inst', name, db)
         # not found -> return handle with empty data (we prefer returning a handle to allow attribute resolvers to return defaults)
-        return Handle('buff_inst', name, {})
+        h = self._missing.get(name)
+        if h is None:
+            h = self._missing[name] = Handle('buff_inst', name, _EMPTY_BUFF_DATA)
+        return h
 
 class BuffAttrResolver(AttrResolverBase):
     def can_resolve(self, handle_type, attr_name):
@@ -282,7 +376,28 @@ class EvalContext:
         self.state = state
         self.modules = module_registry
         self.attrs = attr_registry
+        # identifier chain -> resolved value; only exists between begin_tick() and end_tick()
+        self._ident_cache: Optional[Dict[Tuple[str, ...], float]] = None
+    def begin_tick(self):
+        """Cache resolved identifiers until end_tick(). Call once this tick's state is final;
+           without an open tick every lookup reads self.state directly."""
+        self._ident_cache = {}
+    def end_tick(self):
+        self._ident_cache = None
+    def set_state(self, key: str, value: Any):
+        self.state[key] = value
+        if self._ident_cache is not None:
+            self._ident_cache.clear()
     def resolve_identifier(self, parts: List[str]) -> float:
+        cache = self._ident_cache
+        if cache is None:
+            return self._resolve_uncached(parts)
+        key = tuple(parts)
+        v = cache.get(key)
+        if v is None:
+            v = cache[key] = self._resolve_uncached(parts)
+        return v
+    def _resolve_uncached(self, parts: List[str]) -> float:
         # parts example: ['buff','steady_focus','stack']
         if not parts: return 0.0
         prefix = parts[0]
@@ -389,7 +504,10 @@ if __name__ == "__main__":
     print("Expression:", expr_txt, "=>", val)  # expect true (1.0) because stack==1 so 1>0 -> true
 
     expr2_txt = "buff.short_buff.up = 1"
-    toks2 = lex(expr2_txt); p2 = Parser(toks2); e2 = p2.parse_expr()
+    e2 = parse(expr2_txt)
     print(e2, "=>", e2.eval(ctx))  # expects 0 because short_buff.remains==0 so up==0, 0==1 -> false (0.0)
 
+    cond = compile_condition(expr_txt)
+    print("Codegen:", cond.source.splitlines()[-1].strip(), "=>", cond(ctx))
+
 
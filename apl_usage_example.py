@@ -91,6 +91,11 @@ def simulate_combat_scenario():
         }
     ]
     
+    # 施法ID -> 动作定义，只建一次
+    defs_by_spell_id = {}
+    for definition in strategy.apl_executor.action_registry.actions.values():
+        defs_by_spell_id.setdefault(definition.spell_id, definition)
+    
     for scenario in scenarios:
         print(f"\n场景: {scenario['name']}")
         print(f"Focus: {scenario['focus']}")
@@ -107,11 +112,7 @@ def simulate_combat_scenario():
         
         if action:
             # 查找动作定义
-            action_def = None
-            for name, definition in strategy.apl_executor.action_registry.actions.items():
-                if definition.spell_id == action.spell_id:
-                    action_def = definition
-                    break
+            action_def = defs_by_spell_id.get(action.spell_id)
             
             if action_def:
                 cost_info = ""
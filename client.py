@@ -2,13 +2,13 @@ import sys
 import time
 import threading
 import json
+from collections import deque
 from PyQt6.QtWidgets import QApplication, QWidget, QLabel, QVBoxLayout, QTextEdit, QHBoxLayout
-from PyQt6.QtGui import QPainter, QColor, QPen, QPixmap
+from PyQt6.QtGui import QPixmap, QImage
 from PyQt6.QtCore import Qt, pyqtSignal
 from mss import mss
-from PIL import Image
 import numpy as np
-from util import rgb_to_bytes
+from util import rgb_to_bytes, sample_cells
 from strategy import dummy_strategy, State, BuffManager
 import pyautogui
 
@@ -37,6 +37,8 @@ BLOCKS_X = 64
 BLOCKS_Y = 64
 PIXEL_SIZE = 1
 FPS = 30
+PREVIEW_FPS = 5  # 预览图刷新率，界面预览不需要跟解码同频
+VERBOSE = True  # 是否记录每次释放的技能日志（窗口关闭时统一输出）
 OFFSET_X = 0
 OFFSET_Y = 0  # Lua offsetY=-10, TOPLEFT 是左上角, 全屏模式正向偏移
 
@@ -51,6 +53,8 @@ CONFIG = {
     "grid_size": BLOCKS_X,
     "cell_px": PIXEL_SIZE,
     "fps": FPS,
+    "preview_fps": PREVIEW_FPS,
+    "verbose": VERBOSE,
 }
 
 # ----------------- 监控区域边框窗口 -----------------
@@ -140,23 +144,17 @@ class DecoderGUI(QWidget):
         
         # 更新监控区域图像
         if image is not None:
-            # 将PIL图像转换为QPixmap
-            image_rgb = image.convert('RGB')
-            width, height = image_rgb.size
-            # 放大图像以便更好地查看
+            # RGB ndarray 直接构造 QImage，无需经 PIL/PNG 中转
+            height, width = image.shape[:2]
+            data = np.ascontiguousarray(image).tobytes()
+            qimage = QImage(data, width, height, width * 3, QImage.Format.Format_RGB888).copy()
+            # 放大图像以便更好地查看（最近邻，保持色块边界清晰）
             scale_factor = min(400 // width, 400 // height, 10)  # 最大放大10倍
-            new_width = width * scale_factor
-            new_height = height * scale_factor
-            image_scaled = image_rgb.resize((new_width, new_height), Image.NEAREST)
-            
-            # 转换为QPixmap
-            import io
-            buffer = io.BytesIO()
-            image_scaled.save(buffer, format='PNG')
-            buffer.seek(0)
-            pixmap = QPixmap()
-            pixmap.loadFromData(buffer.getvalue())
-            
+            pixmap = QPixmap.fromImage(qimage).scaled(
+                width * scale_factor, height * scale_factor,
+                Qt.AspectRatioMode.IgnoreAspectRatio,
+                Qt.TransformationMode.FastTransformation
+            )
             self.image_label.setPixmap(pixmap)
 
     def paintEvent(self, event):
@@ -167,13 +165,21 @@ class DecoderGUI(QWidget):
     def update_loop(self):
         sct = mss()
         last_cast = None
-        logs = []
+        logs = deque(maxlen=1000)  # 环形缓冲，只保留最近的日志
+        interval = 1 / CONFIG['fps']
+        deadline = time.perf_counter()
+        preview_every = max(1, CONFIG['fps'] // CONFIG['preview_fps'])
+        frame = 0
         
         while self.running:
             sct_img = sct.grab(self.monitor_region)  # mss截取的图像是 BGRA 格式（蓝、绿、红、透明度）
+            # 直接在原始 BGRA 缓冲区上建视图，[2::-1] 取 R,G,B 通道，不经 PIL 拷贝
+            # （sct_img.bgra 是 bytes(raw) 的整帧拷贝，这里用 raw 本身；每次 grab 都是新的 bytearray）
+            bgra = np.frombuffer(sct_img.raw, dtype=np.uint8).reshape(sct_img.height, sct_img.width, 4)
+            pixels = bgra[..., 2::-1]
             # 解码
             try:
-                seq, payload, ok = rgb_to_bytes(sct_img.rgb)
+                seq, payload, ok = rgb_to_bytes(sample_cells(pixels, self.grid_size, self.cell_px))
 
                 if seq is None:
                     info = "等待有效帧... (未检测到0xAA帧头)"
@@ -184,7 +190,6 @@ class DecoderGUI(QWidget):
                         data = json.loads(payload.decode('utf-8'))
                         state = State(**data)
                         s, r = dummy_strategy(state)
-                        buff = BuffManager(state)
                         
                         if mouse_state.get(Button.right) and (state.casting is None or state.casting.remaining_ms < 100):
                             if s == '奥术冲击':
@@ -195,21 +200,36 @@ class DecoderGUI(QWidget):
                                 pyautogui.press('a')
                             if s.startswith('爆发-'):
                                 pyautogui.press('m')
-                            bufs = []
-                            for b in BuffManager.ALL_BUFFS:
-                                buf = getattr(buff, b)
-                                if buf.up and not b.startswith('id'):
-                                    bufs.append(f'{buf.name}({buf.stack}) {buf.remaining_ms/1000:.1f}s')
-                            print(f"释放 {s} {r}. buffs: {bufs}")
+                            if CONFIG['verbose']:
+                                buff = BuffManager(state)
+                                bufs = []
+                                for b in BuffManager.ALL_BUFFS:
+                                    buf = getattr(buff, b)
+                                    if buf.up and not b.startswith('id'):
+                                        bufs.append(f'{buf.name}({buf.stack}) {buf.remaining_ms/1000:.1f}s')
+                                logs.append(f"释放 {s} {r}. buffs: {bufs}")
                         output = json.dumps(data, indent=4, ensure_ascii=False)
                         info += f"\n{s}\n{r}\n{'正在释放'+state.casting.name if state.casting else ''}\n{output}"
             except Exception as e:
                 info = f"解码错误: {e}"
 
-            # 发送信号时同时传递文本信息和图像
-            self.update_signal.emit(info, Image.frombytes("RGB", sct_img.size, sct_img.rgb))
+            # 发送信号时同时传递文本信息和图像；预览图按 preview_fps 降频
+            image = pixels if frame % preview_every == 0 else None
+            frame += 1
+            self.update_signal.emit(info, image)
 
-            time.sleep(1 / CONFIG['fps'])
+            # 按截止时间调度：扣除本帧处理耗时，避免帧间隔漂移
+            deadline += interval
+            sleep_for = deadline - time.perf_counter()
+            if sleep_for > 0:
+                time.sleep(sleep_for)
+            else:
+                deadline = time.perf_counter()  # 已落后则不追帧，重新对齐
+
+        # 循环内不做终端 I/O，退出时一次性输出缓冲的日志
+        if logs:
+            sys.stdout.write("\n".join(logs) + "\n")
+            sys.stdout.flush()
 
 
     def mousePressEvent(self, event):
@@ -233,6 +253,8 @@ class DecoderGUI(QWidget):
 
     def closeEvent(self, event):
         self.running = False
+        # 等待解码线程退出，让它把缓冲的日志输出完再结束进程
+        self.thread.join(timeout=1.0)
         # 关闭边框窗口
         if hasattr(self, 'overlay'):
             self.overlay.close()
@@ -70,20 +70,26 @@ class BuffManager(Identifier):
         "奥术涌动",
         "奥术之魂"
     ]
+    _KNOWN_BUFFS = frozenset(ALL_BUFFS)
     empty_buff = Buff(spell_id=0, stacks=0, remaining_ms=0, name="", icon=0)
     def __init__(self, state: State):
         self.state = state
+        # 按名字和 id 建索引，之后的查找不再线性扫描 state.buffs（同名时保留列表中第一个）
+        self._by_key: dict[str, Buff] = {}
+        for buff in state.buffs:
+            self._by_key.setdefault(buff.name, buff)
+            self._by_key.setdefault(f"id{buff.spell_id}", buff)
 
     def can_resolve(self, attr: str) -> bool:
-        return attr in self.ALL_BUFFS
+        return attr in self._KNOWN_BUFFS
     
     def __getattr__(self, attr: str) -> Optional[Buff]:
         if not self.can_resolve(attr):
             raise AttributeError(f"BuffManager has no attribute {attr}")
-        for buff in self.state.buffs:
-            if buff.name == attr or f"id{buff.spell_id}" == attr:
-                return buff
-        return self.empty_buff
+        buff = self._by_key.get(attr, self.empty_buff)
+        # BuffManager 每帧重建；缓存到实例属性后，本帧内重复访问不再进入 __getattr__
+        self.__dict__[attr] = buff
+        return buff
 
 
 def dummy_strategy(state: State):
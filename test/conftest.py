@@ -0,0 +1,36 @@
+"""
+pytest 配置文件
+
+提供 apl.py / util.py 测试用的 fixtures
+"""
+import pytest
+import sys
+import os
+
+# 添加仓库根目录到 Python 路径，确保可以导入 apl / util
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from apl import ModuleRegistry, AttrRegistry, BuffModule, BuffAttrResolver, ExampleNestedAttrResolver, EvalContext
+
+
+@pytest.fixture
+def apl_state():
+    """提供示例 APL 状态"""
+    return {
+        'buffs': {
+            'steady_focus': {'remains': 5.0, 'stacks': 1},
+            'short_buff': {'remains': 0.0, 'stacks': 0},
+        },
+        'active_enemies': 1,
+    }
+
+
+@pytest.fixture
+def apl_ctx(apl_state):
+    """提供注册了 buff 模块和属性解析器的 EvalContext"""
+    modules = ModuleRegistry()
+    modules.register(BuffModule())
+    attrs = AttrRegistry()
+    attrs.register(BuffAttrResolver())
+    attrs.register(ExampleNestedAttrResolver())
+    return EvalContext(apl_state, modules, attrs)
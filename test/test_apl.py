@@ -0,0 +1,207 @@
+"""
+测试 apl.py 中的表达式解析与求值
+"""
+import pytest
+import re
+import sys
+import os
+
+# 添加仓库根目录到路径以便导入模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from apl import lex, Parser, ParseError, parse, compile_expr, compile_condition
+
+
+class TestEvalContextCache:
+    """测试 EvalContext 的标识符缓存生命周期"""
+
+    def test_no_tick_reads_live_state(self, apl_ctx, apl_state):
+        """未开启 tick 时，原地修改 state 立即生效"""
+        cond = compile_condition('buff.steady_focus.up')
+        assert cond(apl_ctx) == 1.0
+        apl_state['buffs']['steady_focus']['remains'] = 0.0
+        assert cond(apl_ctx) == 0.0
+        assert parse('buff.steady_focus.up').eval(apl_ctx) == 0.0
+
+    def test_tick_caches_until_end(self, apl_ctx, apl_state):
+        """tick 内缓存解析结果，end_tick 后重新读取 state"""
+        cond = compile_condition('buff.steady_focus.stack')
+        apl_ctx.begin_tick()
+        assert cond(apl_ctx) == 1.0
+        apl_state['buffs']['steady_focus']['stacks'] = 3
+        assert cond(apl_ctx) == 1.0
+        apl_ctx.end_tick()
+        assert cond(apl_ctx) == 3.0
+
+    def test_begin_tick_drops_previous_values(self, apl_ctx, apl_state):
+        """每次 begin_tick 都从空缓存开始"""
+        apl_ctx.begin_tick()
+        assert apl_ctx.resolve_identifier(['buff', 'short_buff', 'up']) == 0.0
+        apl_state['buffs']['short_buff']['remains'] = 2.0
+        apl_ctx.begin_tick()
+        assert apl_ctx.resolve_identifier(['buff', 'short_buff', 'up']) == 1.0
+
+    def test_set_state_clears_open_tick(self, apl_ctx):
+        """set_state 在 tick 内修改状态时清空缓存"""
+        apl_ctx.begin_tick()
+        assert apl_ctx.resolve_identifier(['buff', 'short_buff', 'remains']) == 0.0
+        apl_ctx.set_state('buffs', {'short_buff': {'remains': 4.0, 'stacks': 1}})
+        assert apl_ctx.resolve_identifier(['buff', 'short_buff', 'remains']) == 4.0
+
+
+class TestLexer:
+    """测试 lex 的 token 输出与错误位置"""
+
+    def test_tokens_with_positions_across_newlines(self):
+        """token 元组带行列号，换行后列号从 1 重新计数"""
+        assert lex('a\n  b.c\n\n(1)') == [
+            ('IDENT', 'a', 1, 1),
+            ('IDENT', 'b', 2, 3),
+            ('DOT', '.', 2, 4),
+            ('IDENT', 'c', 2, 5),
+            ('LPAREN', '(', 4, 1),
+            ('NUMBER', '1', 4, 2),
+            ('RPAREN', ')', 4, 3),
+            ('EOF', '', 4, 4),
+        ]
+
+    def test_eof_position(self):
+        """EOF 位于最后一个字符之后（包括尾部空白）"""
+        assert lex('')[-1] == ('EOF', '', 1, 1)
+        assert lex('ab  ')[-1] == ('EOF', '', 1, 5)
+        assert lex('ab\n')[-1] == ('EOF', '', 2, 1)
+
+    def test_operators(self):
+        """多字符运算符优先匹配，'=' 与 '==' 同为 EQ"""
+        kinds = [t[0] for t in lex('== = != <= >= < > . ( ) , + - * & | ^ !')]
+        assert kinds == [
+            'EQ', 'EQ', 'NE', 'LE', 'GE', 'LT', 'GT', 'DOT', 'LPAREN', 'RPAREN',
+            'COMMA', 'PLUS', 'MINUS', 'STAR', 'AMP', 'PIPE', 'CARET', 'BANG', 'EOF',
+        ]
+        assert lex('a<=1')[1][:2] == ('LE', '<=')
+
+    def test_numbers(self):
+        """整数与小数都是一个 NUMBER token"""
+        assert lex('12 3.25')[:2] == [('NUMBER', '12', 1, 1), ('NUMBER', '3.25', 1, 4)]
+
+    @pytest.mark.parametrize("text,message", [
+        ('a #', "Unexpected '#' at 1:3"),
+        ('a\n  $', "Unexpected '$' at 2:3"),
+        ('x\n\ny @', "Unexpected '@' at 3:3"),
+    ])
+    def test_syntax_error_position(self, text, message):
+        """非法字符报告所在行列"""
+        with pytest.raises(SyntaxError, match=re.escape(message)):
+            lex(text)
+
+
+class TestParser:
+    """测试表达式解析的优先级、结合性与错误路径"""
+
+    @pytest.mark.parametrize("text,tree", [
+        ('1 - 2 - 3', '((Lit(1.0) - Lit(2.0)) - Lit(3.0))'),
+        ('1 + 2 * 3', '(Lit(1.0) + (Lit(2.0) * Lit(3.0)))'),
+        ('(1 + 2) * 3', '((Lit(1.0) + Lit(2.0)) * Lit(3.0))'),
+        ('1 + 1 > 1', '((Lit(1.0) + Lit(1.0)) > Lit(1.0))'),
+        ('a | b & c', '(Ident(a) | (Ident(b) & Ident(c)))'),
+        ('a & b | c', '((Ident(a) & Ident(b)) | Ident(c))'),
+        ('a > 1 & b < 2', '((Ident(a) > Lit(1.0)) & (Ident(b) < Lit(2.0)))'),
+        ('x.y.z >= 2', '(Ident(x.y.z) >= Lit(2.0))'),
+    ])
+    def test_precedence_and_associativity(self, text, tree):
+        """* 高于 +/-，高于比较，高于 &，高于 |；同级左结合"""
+        assert repr(parse(text)) == tree
+
+    @pytest.mark.parametrize("text", ['a and b', 'a AND b', 'a And b', 'a aNd b'])
+    def test_and_keyword_any_case(self, text):
+        """and 关键字不区分大小写"""
+        assert repr(parse(text)) == '(Ident(a) and Ident(b))'
+
+    @pytest.mark.parametrize("text", ['a or b', 'a OR b', 'a Or b', 'a oR b'])
+    def test_or_keyword_any_case(self, text):
+        """or 关键字不区分大小写，优先级低于 and"""
+        assert repr(parse(text)) == '(Ident(a) or Ident(b))'
+        assert repr(parse(text + ' and c')) == '(Ident(a) or (Ident(b) and Ident(c)))'
+
+    def test_leaf_nodes_shared_within_one_parse(self):
+        """同一次解析中相同的叶子节点共享，且 parts 为不可变元组"""
+        e = Parser(lex('buff.x.up & 1 | buff.x.up & 1')).parse_expr()
+        assert e.a.a is e.b.a and e.a.b is e.b.b
+        assert e.a.a.parts == ('buff', 'x', 'up')
+
+    def test_parse_is_memoized(self):
+        """相同文本返回同一棵语法树"""
+        assert parse('buff.x.up & y > 1') is parse('buff.x.up & y > 1')
+
+    @pytest.mark.parametrize("text,message", [
+        ('', 'primary'),
+        ('1 +', 'primary'),
+        ('!a', 'primary'),
+        ('a.', "Expected IDENT got ('EOF', '', 1, 3)"),
+        ('a.1', "Expected IDENT got ('NUMBER', '1', 1, 3)"),
+        ('(1', "Expected RPAREN got ('EOF', '', 1, 3)"),
+    ])
+    def test_parse_errors(self, text, message):
+        """不完整或非法的表达式抛出 ParseError"""
+        with pytest.raises(ParseError, match=re.escape(message)):
+            Parser(lex(text)).parse_expr()
+
+
+CODEGEN_EXPRS = [
+    '1',
+    '0',
+    '2.5 * 4 - 1',
+    '1 - 2 - 3',
+    'buff.steady_focus.up',
+    'buff.steady_focus.stack > 0',
+    'buff.short_buff.up = 1',
+    'buff.short_buff.remains == 0',
+    'buff.steady_focus.remains >= 5 & buff.short_buff.up',
+    'buff.short_buff.up | buff.steady_focus.stack',
+    'buff.short_buff.stack and 1',
+    'buff.short_buff.stack OR 0',
+    'buff.unknown.up | buff.steady_focus.remains * 2 > 9',
+    '(buff.steady_focus.stack + 2) * 3 != 9',
+    'unknown.thing < 1',
+    '2 & 3',
+    '0 | 0.5',
+    '1' + '0' * 400 + ' > 0',
+    ' & '.join(['buff.steady_focus.up'] * 200),
+    ' | '.join(['buff.short_buff.up'] * 200),
+]
+
+
+class TestCodegen:
+    """测试 compile_expr 生成的函数与 Expr.eval 结果一致"""
+
+    @pytest.mark.parametrize("text", CODEGEN_EXPRS)
+    def test_matches_tree_eval(self, apl_ctx, text):
+        """生成代码与逐节点求值结果相同"""
+        assert compile_condition(text)(apl_ctx) == parse(text).eval(apl_ctx)
+
+    def test_huge_literal(self, apl_ctx):
+        """超长数字解析为 inf，生成代码仍可执行"""
+        assert compile_condition('1' + '0' * 400 + ' > 0')(apl_ctx) == 1.0
+
+    def test_deep_condition_falls_back_to_tree_walk(self, apl_ctx):
+        """嵌套过深无法编译时退回 Expr.eval"""
+        cond = compile_condition(' & '.join(['buff.steady_focus.up'] * 200))
+        assert cond.source is None
+        assert cond(apl_ctx) == 1.0
+
+    def test_compile_expr_memoized_per_node(self):
+        """同一节点只编译一次"""
+        e = parse('buff.steady_focus.up & 1')
+        assert compile_expr(e) is compile_expr(e)
+
+
+class TestBuffModule:
+    """测试 BuffModule 对未知 buff 的处理"""
+
+    def test_missing_buff_handle_is_read_only(self, apl_ctx):
+        """未知 buff 共享的空数据不可写，不会污染后续查询"""
+        h = apl_ctx.modules.get('buff').get_handle('nope', apl_ctx)
+        with pytest.raises(TypeError):
+            h.data['remains'] = 10.0
+        assert apl_ctx.resolve_identifier(['buff', 'nope', 'up']) == 0.0
+        assert apl_ctx.modules.get('buff').get_handle('nope', apl_ctx) is h
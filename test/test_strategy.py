@@ -0,0 +1,67 @@
+"""
+测试 strategy.py 中的 BuffManager 查找
+"""
+import pytest
+import sys
+import os
+
+# 添加仓库根目录到路径以便导入模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from strategy import State, Buff, BuffManager
+
+
+def make_buff(name, spell_id, stacks=1, remaining_ms=5000):
+    return Buff(spell_id=spell_id, stacks=stacks, remaining_ms=remaining_ms, name=name, icon=1)
+
+
+class TestBuffManagerLookup:
+    """测试 BuffManager 按名字 / id 查找 buff"""
+
+    def test_first_buff_with_same_name_wins(self):
+        """同名 buff 取 state.buffs 中的第一个"""
+        first = make_buff("奥术涌动", 1, stacks=1)
+        second = make_buff("奥术涌动", 2, stacks=3)
+        manager = BuffManager(State(buffs=[first, second]))
+        assert manager.奥术涌动 is first
+
+    def test_lookup_by_spell_id(self):
+        """id<spell_id> 形式按法术 id 查找"""
+        orb = make_buff("法术火焰宝珠", 449400, stacks=2)
+        manager = BuffManager(State(buffs=[make_buff("奥术之魂", 7), orb]))
+        assert getattr(manager, "id449400") is orb
+
+    def test_known_name_without_buff_returns_empty(self):
+        """已知但不存在的 buff 返回 empty_buff"""
+        manager = BuffManager(State(buffs=[make_buff("奥术之魂", 7)]))
+        assert manager.敏锐直觉 is BuffManager.empty_buff
+        assert not manager.敏锐直觉.up
+
+    def test_unknown_name_raises(self):
+        """不在 ALL_BUFFS 中的名字抛出 AttributeError"""
+        manager = BuffManager(State(buffs=[make_buff("未知buff", 9)]))
+        with pytest.raises(AttributeError):
+            manager.未知buff
+
+
+class TestBuffManagerMemo:
+    """测试 BuffManager 的实例级缓存"""
+
+    def test_second_access_served_from_instance_dict(self, monkeypatch):
+        """第二次访问直接命中实例 __dict__，不再进入 __getattr__"""
+        buff = make_buff("奥术之魂", 7)
+        manager = BuffManager(State(buffs=[buff]))
+        assert manager.奥术之魂 is buff
+        assert manager.__dict__["奥术之魂"] is buff
+
+        def fail(self, attr):
+            raise AssertionError(f"__getattr__ called for {attr}")
+        monkeypatch.setattr(BuffManager, "__getattr__", fail)
+        assert manager.奥术之魂 is buff
+
+    def test_new_manager_sees_changed_buffs(self):
+        """state.buffs 变化后新建的 BuffManager 读到新数据"""
+        state = State(buffs=[make_buff("奥术之魂", 7, stacks=1)])
+        assert BuffManager(state).奥术之魂.stack == 1
+        state.buffs = [make_buff("奥术之魂", 7, stacks=4)]
+        assert BuffManager(state).奥术之魂.stack == 4
@@ -0,0 +1,113 @@
+"""
+测试 util.py 中的 CRC8 校验与像素解码
+"""
+import pytest
+import numpy as np
+import sys
+import os
+
+# 添加仓库根目录到路径以便导入模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util import crc8, rgb_to_bytes, sample_cells, _cell_centers
+
+
+def crc8_bitwise(data, poly=0x07, init=0x00):
+    """逐位计算的参考实现"""
+    crc = init
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) if crc & 0x80 else (crc << 1)
+            crc &= 0xFF
+    return crc
+
+
+class TestCrc8:
+    """测试查表实现的 crc8"""
+
+    def test_known_answer(self):
+        """CRC-8 (多项式0x07) 标准校验值"""
+        assert crc8(b"123456789") == 0xF4
+
+    @pytest.mark.parametrize("poly,init,expected", [
+        (0xD5, 0x00, 0xBC),  # CRC-8/DVB-S2
+        (0x9B, 0xFF, 0xDA),  # CRC-8/CDMA2000
+    ])
+    def test_non_default_polynomial(self, poly, init, expected):
+        """非默认多项式和初始值"""
+        assert crc8(b"123456789", poly=poly, init=init) == expected
+
+    def test_empty(self):
+        """空数据返回初始值"""
+        assert crc8(b"") == 0x00
+        assert crc8(b"", init=0x5A) == 0x5A
+
+    def test_buffer_types(self):
+        """bytes / bytearray / memoryview 切片结果一致"""
+        frame = bytes(range(256)) * 2
+        expected = crc8_bitwise(frame[:300])
+        assert crc8(frame[:300]) == expected
+        assert crc8(bytearray(frame)[:300]) == expected
+        assert crc8(memoryview(frame)[:300]) == expected
+
+    @pytest.mark.parametrize("poly", [0x07, 0x1D, 0x31])
+    def test_matches_bitwise(self, poly):
+        """与逐位实现在所有单字节及多字节输入上一致"""
+        for b in range(256):
+            assert crc8(bytes([b]), poly=poly) == crc8_bitwise(bytes([b]), poly=poly)
+        data = bytes((i * 37 + 11) & 0xFF for i in range(1000))
+        assert crc8(data, poly=poly, init=0x42) == crc8_bitwise(data, poly=poly, init=0x42)
+
+
+def encode_frame(seq, payload):
+    """按 rgb_to_bytes 的帧格式打包: seq(2) + len(2) + payload + crc8"""
+    data = seq.to_bytes(2, 'big') + len(payload).to_bytes(2, 'big') + payload
+    return data + bytes([crc8(data)])
+
+
+class TestSampleCells:
+    """测试 sample_cells 的色块中心取样"""
+
+    def test_single_pixel_cells_identity(self):
+        """cell_px=1 时输出与原始 RGB 字节完全相同"""
+        rng = np.random.default_rng(0)
+        pixels = rng.integers(0, 256, size=(64, 64, 3), dtype=np.uint8)
+        assert sample_cells(pixels, 64, 1) == pixels.tobytes()
+
+    @pytest.mark.parametrize("cell_px", [2, 3, 4])
+    def test_upscaled_cells(self, cell_px):
+        """每个色块放大为 cell_px×cell_px 后，取样结果还原原始网格"""
+        rng = np.random.default_rng(cell_px)
+        grid = rng.integers(0, 256, size=(16, 16, 3), dtype=np.uint8)
+        pixels = np.repeat(np.repeat(grid, cell_px, axis=0), cell_px, axis=1)
+        assert sample_cells(pixels, 16, cell_px) == grid.tobytes()
+
+    def test_samples_cell_centers(self):
+        """只取每个色块的中心像素"""
+        pixels = np.zeros((8, 8, 3), dtype=np.uint8)
+        pixels[2, 2] = (1, 2, 3)
+        pixels[2, 6] = (4, 5, 6)
+        pixels[6, 2] = (7, 8, 9)
+        pixels[6, 6] = (10, 11, 12)
+        assert sample_cells(pixels, 2, 4) == bytes(range(1, 13))
+
+    def test_cached_centers_read_only(self):
+        """缓存的中心坐标不可修改，避免污染后续取样"""
+        idx = _cell_centers(16, 4)
+        with pytest.raises(ValueError):
+            idx[0] = 99
+        assert _cell_centers(16, 4)[0] == 2
+
+    def test_bgra_view(self):
+        """BGRA 缓冲区的 [..., 2::-1] 视图按 RGB 取样"""
+        bgra = np.array([[[30, 20, 10, 255], [60, 50, 40, 255]]], dtype=np.uint8)
+        assert sample_cells(bgra[..., 2::-1], 1, 1) == bytes([10, 20, 30])
+
+    @pytest.mark.parametrize("cell_px", [1, 4])
+    def test_frame_round_trip(self, cell_px):
+        """编码进像素的帧经取样后能被 rgb_to_bytes 校验通过"""
+        frame = encode_frame(169, b'{"hp": 100}')
+        grid = np.frombuffer(frame.ljust(8 * 8 * 3, b'\x00'), dtype=np.uint8).reshape(8, 8, 3)
+        pixels = np.repeat(np.repeat(grid, cell_px, axis=0), cell_px, axis=1)
+        assert rgb_to_bytes(sample_cells(pixels, 8, cell_px)) == (169, b'{"hp": 100}', True)
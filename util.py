@@ -7,29 +7,45 @@ util.py - 工具函数库
 
 import numpy as np
 from PIL import Image
-from typing import Tuple, Optional, List
+from functools import lru_cache
+from typing import Tuple
+
+def _crc8_table(poly: int) -> bytes:
+    """生成多项式poly对应的256项CRC-8查找表"""
+    table = bytearray(256)
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            if crc & 0x80:
+                crc = ((crc << 1) ^ poly) & 0xFF
+            else:
+                crc = (crc << 1) & 0xFF
+        table[i] = crc
+    return bytes(table)
+
+
+# 多项式 -> 查找表；默认多项式0x07在导入时生成
+_CRC8_TABLES = {0x07: _crc8_table(0x07)}
+
 
 def crc8(data: bytes, poly: int = 0x07, init: int = 0x00) -> int:
     """
-    CRC-8校验函数 (多项式0x07)
+    CRC-8校验函数 (多项式0x07)，查表实现
     
     Args:
-        data: 字节数据
+        data: 字节数据 (bytes/bytearray/memoryview 均可，无需转成列表)
         poly: CRC多项式 (默认0x07)
         init: 初始值 (默认0x00)
     
     Returns:
         CRC-8校验值
     """
-    crc = init
+    table = _CRC8_TABLES.get(poly)
+    if table is None:
+        table = _CRC8_TABLES[poly] = _crc8_table(poly)
+    crc = init & 0xFF
     for byte in data:
-        crc ^= byte
-        for _ in range(8):
-            if crc & 0x80:
-                crc = (crc << 1) ^ poly
-            else:
-                crc <<= 1
-            crc &= 0xFF
+        crc = table[crc ^ byte]
     return crc
 
 
@@ -37,11 +53,36 @@ def rgb_to_bytes(flat_bytes: bytes) -> Tuple[int, bytes, bool]:
     seq_id = int.from_bytes(flat_bytes[:2], byteorder='big')
     data_len = int.from_bytes(flat_bytes[2:4], byteorder='big')
     
-    checksum = crc8(flat_bytes[:data_len+4])
+    # memoryview切片不拷贝数据，crc8直接在原缓冲区上查表
+    checksum = crc8(memoryview(flat_bytes)[:data_len+4])
     given = flat_bytes[data_len+4:data_len+5]
     return seq_id, flat_bytes[4:data_len+4], bytes([checksum]) == given
 
 
+@lru_cache(maxsize=8)
+def _cell_centers(grid_size: int, cell_px: int) -> np.ndarray:
+    """每个色块中心像素的坐标 (行列共用)；缓存的数组被所有调用方共享，设为只读"""
+    idx = np.arange(grid_size) * cell_px + cell_px // 2
+    idx.setflags(write=False)
+    return idx
+
+
+def sample_cells(pixels: np.ndarray, grid_size: int, cell_px: int) -> bytes:
+    """
+    取每个色块的中心像素，按行优先展平成字节流
+    
+    Args:
+        pixels: (H, W, 3) 的RGB像素矩阵
+        grid_size: 每行/列的色块数
+        cell_px: 每个色块的边长 (像素)
+    
+    Returns:
+        grid_size*grid_size*3 字节，可直接交给 rgb_to_bytes
+    """
+    idx = _cell_centers(grid_size, cell_px)
+    return pixels[idx[:, None], idx[None, :]].tobytes()
+
+
 def bytes_to_rgb(seq: int, data: bytes, width: int, height: int) -> np.ndarray:
     
     seq_bytes = seq.to_bytes(2, byteorder='big')